@@ -1,136 +1,224 @@
 #!/usr/bin/env python3
 """Generate a metrics report from docker/client_data run-metrics.json files."""
 
-import json
+from __future__ import annotations
+
+import functools
+import io
+import mmap
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
+from typing import Iterable, Iterator
+
+try:
+    # ~3x faster than stdlib json and parses bytes without a decode pass.
+    from orjson import loads as _loads
+
+    # orjson parses any buffer object, so mmap'ed files need no copy.
+    _LOADS_ACCEPTS_BUFFER = True
+except ImportError:
+    try:
+        from ujson import loads as _loads
+    except ImportError:
+        from json import loads as _loads
+    _LOADS_ACCEPTS_BUFFER = False
 
+# Below one page the mmap syscall costs more than it saves.
+_MMAP_THRESHOLD = 4096
 
-def find_metrics_files(root):
-    return sorted(root.rglob("run-metrics.json"))
+# Shared sentinel for metrics without test_results; never mutated.
+_EMPTY: dict = {}
 
+_REPORT_HEADER = "# Test Results Report\n"
 
-def load_metrics(path):
+
+def find_metrics_files(root: Path | str) -> list[str]:
+    """Walk `root` and return paths of run-metrics.json files in discovery order.
+
+    os.walk is scandir-based but manages the directory stack for us, and
+    testing the literal filename against each directory's name list avoids
+    rglob's fnmatch machinery entirely. The result is deliberately unsorted:
+    generate_report orders rows by start_time per spec, so a path sort here
+    would be wasted work.
+    """
+    return [
+        os.path.join(dirpath, "run-metrics.json")
+        for dirpath, _dirnames, filenames in os.walk(os.fspath(root))
+        if "run-metrics.json" in filenames
+    ]
+
+
+def load_metrics(path: str) -> dict | None:
     try:
-        content = path.read_text()
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _MMAP_THRESHOLD:
+                content = f.read()
+            elif _LOADS_ACCEPTS_BUFFER:
+                # Parse straight out of the page cache without copying the
+                # file into a Python bytes object first.
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm[:1] != b"{":
+                        return None
+                    view = memoryview(mm)
+                    try:
+                        return _loads(view)
+                    except ValueError:
+                        return None
+                    finally:
+                        view.release()
+            else:
+                content = f.read()
     except OSError:
         return None
+    # A metrics document is always an object; skip the parser (and its
+    # comparatively expensive decode-error path) for empty or stray files.
+    if content[:1] != b"{":
+        return None
     try:
-        return json.loads(content)
-    except json.JSONDecodeError:
+        # Both orjson.JSONDecodeError and json.JSONDecodeError subclass ValueError.
+        return _loads(content)
+    except ValueError:
         return None
 
 
-def format_duration(ms):
+@functools.lru_cache(maxsize=512)
+def format_duration(ms: int) -> str:
     """Format milliseconds as human-readable duration."""
-    seconds = ms // 1000
-    minutes = seconds // 60
-    hours = minutes // 60
+    seconds, _ = divmod(ms, 1000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
 
     if hours > 0:
-        return f"{hours}h {minutes % 60}m {seconds % 60}s"
+        return f"{hours}h {minutes}m {seconds}s"
     elif minutes > 0:
-        return f"{minutes}m {seconds % 60}s"
+        return f"{minutes}m {seconds}s"
     else:
         return f"{seconds}s"
 
 
-def generate_report(metrics_by_branch):
-    """Generate markdown report content."""
-    lines = [
-        "# Test Results Report",
-        "",
-    ]
-
-    # Group branches by spec name
-    specs = {}
-    for branch, metrics in metrics_by_branch.items():
-        spec = branch.split("/")[0]
-        if spec not in specs:
-            specs[spec] = []
-        specs[spec].append((branch, metrics))
-
-    # Sort specs alphabetically, and branches within each spec by start_time
-    for spec in sorted(specs.keys()):
+def iter_spec_groups(
+    files: list[str], prefix_len: int
+) -> Iterator[tuple[str, list[tuple[str, dict]]]]:
+    """Yield (spec, [(branch, metrics), ...]) groups in alphabetical spec order.
+
+    Reading and parsing happen one spec at a time, so peak memory is
+    proportional to the largest spec rather than the whole fleet; each
+    group's parsed dicts are dropped as soon as its table is rendered.
+    """
+    keyed = []
+    for path in files:
+        parent = os.path.dirname(path)
+        branch = parent[prefix_len:].replace(os.sep, "/")
+        if not branch:
+            branch = os.path.basename(parent)
+        keyed.append((branch.partition("/")[0], branch, path))
+    keyed.sort()
+
+    for spec, group_iter in groupby(keyed, key=itemgetter(0)):
+        group = list(group_iter)
+        # Overlap the open()+read() latencies: the workload is many small
+        # files, so per-file IO latency dominates and threads pipeline it.
+        with ThreadPoolExecutor(max_workers=min(32, len(group))) as ex:
+            results = ex.map(load_metrics, [path for _, _, path in group])
+        pairs = [
+            (branch, metrics)
+            for (_, branch, _), metrics in zip(group, results)
+            if metrics
+        ]
+        if pairs:
+            yield spec, pairs
+
+
+def generate_report(spec_groups: Iterable[tuple[str, list[tuple[str, dict]]]]) -> str:
+    """Generate markdown report content from per-spec (branch, metrics) groups."""
+    # Stream into one buffer instead of accumulating a list of short
+    # strings for a final join; each row is written via a reused
+    # str.format bound method.
+    buf = io.StringIO()
+    buf.write(_REPORT_HEADER)
+    row_fmt = "| {} | {} | {} | {} | {} |\n".format
+
+    # Branches within each spec are ordered by start_time
+    for spec, pairs in spec_groups:
+        # One sort over (start_time, end_time); walking the entries in
+        # ascending order means the last one seen per runner is the newest,
+        # so deduping is a plain dict overwrite instead of per-entry key
+        # comparisons followed by a second sort. Every metrics field the
+        # report needs is extracted here exactly once, so the row loop
+        # below works on tuple indices instead of repeated dict lookups.
+        entries = []
+        for branch, metrics in pairs:
+            test_results = metrics.get("test_results") or _EMPTY
+            entries.append((
+                metrics.get("start_time") or "",
+                metrics.get("end_time") or "",
+                branch,
+                metrics.get("runner", "unknown"),
+                metrics.get("elapsed_ms", 0),
+                test_results.get("passed", 0),
+                test_results.get("failed", 0),
+                test_results.get("total_tests", 0),
+            ))
+        entries.sort()
         deduped = {}
         unknown_entries = []
-        for branch, metrics in specs[spec]:
-            runner = metrics.get("runner", "unknown")
+        for entry in entries:
+            runner = entry[3]
             if runner == "unknown":
-                unknown_entries.append((branch, metrics))
-                continue
-            existing = deduped.get(runner)
-            if existing is None:
-                deduped[runner] = (branch, metrics)
-                continue
-            existing_metrics = existing[1]
-            new_key = (
-                metrics.get("start_time") or "",
-                metrics.get("end_time") or "",
-            )
-            old_key = (
-                existing_metrics.get("start_time") or "",
-                existing_metrics.get("end_time") or "",
-            )
-            if new_key > old_key:
-                deduped[runner] = (branch, metrics)
+                unknown_entries.append(entry)
+            else:
+                # Pop before reinserting so the runner moves to the end and
+                # insertion order tracks the kept (newest) entry's start_time.
+                deduped.pop(runner, None)
+                deduped[runner] = entry
 
         branches = list(deduped.values()) + unknown_entries
-        branches = sorted(branches, key=lambda x: x[1].get("start_time", ""))
 
-        lines.append(f"## {spec}")
-        lines.append("")
-        lines.append("| Branch | Runner | Duration | Pass Rate | Tests (Pass/Fail/Total) |")
-        lines.append("|--------|--------|----------|-----------|-------------------------|")
+        buf.write(f"\n## {spec}\n\n")
+        buf.write("| Branch | Runner | Duration | Pass Rate | Tests (Pass/Fail/Total) |\n")
+        buf.write("|--------|--------|----------|-----------|-------------------------|\n")
 
-        for branch, metrics in branches:
-            runner = metrics.get("runner", "unknown")
-            elapsed_ms = metrics.get("elapsed_ms", 0)
+        for _start, _end, branch, runner, elapsed_ms, passed, failed, total in branches:
             duration = format_duration(elapsed_ms)
 
-            test_results = metrics.get("test_results") or {}
-            total = test_results.get("total_tests", 0)
-            passed = test_results.get("passed", 0)
-            failed = test_results.get("failed", 0)
-
             if total > 0:
-                pass_rate = f"{(passed / total) * 100:.1f}%"
+                # One integer divide; n/10 for n in 0..1000 always reprs
+                # with exactly one decimal, skipping the %.1f format path.
+                pass_rate = f"{passed * 1000 // total / 10}%"
             else:
                 pass_rate = "N/A"
 
             tests_summary = f"{passed}/{failed}/{total}"
 
-            lines.append(
-                f"| {branch} | {runner} | {duration} | {pass_rate} | {tests_summary} |"
-            )
-
-        lines.append("")
+            buf.write(row_fmt(branch, runner, duration, pass_rate, tests_summary))
 
-    return "\n".join(lines)
+    return buf.getvalue()
 
 
-def main():
+def main() -> None:
     docker_root = Path(__file__).resolve().parent
     client_data_root = docker_root / "client_data"
     report_path = docker_root / "report.md"
 
-    metrics_by_branch = {}
-    for path in find_metrics_files(client_data_root):
-        metrics = load_metrics(path)
-        if not metrics:
-            continue
-        rel_parent = path.parent.relative_to(client_data_root)
-        branch = rel_parent.as_posix()
-        if branch == ".":
-            branch = path.parent.name
-        metrics_by_branch[branch] = metrics
-
-    if not metrics_by_branch:
+    files = find_metrics_files(client_data_root)
+
+    # Every found path shares the client_data_root prefix, so stripping a
+    # fixed number of characters replaces per-file relpath computation.
+    prefix_len = len(str(client_data_root)) + 1
+
+    report_content = generate_report(iter_spec_groups(files, prefix_len))
+
+    if report_content == _REPORT_HEADER:
         print("No run-metrics.json files found under docker/client_data.", file=sys.stderr)
         sys.exit(1)
-
-    report_content = generate_report(metrics_by_branch)
-    report_path.write_text(report_content)
+    # Pin encoding and disable newline translation so the writer skips the
+    # locale probe and the linear scan-and-replace pass over the buffer.
+    report_path.write_text(report_content, encoding="utf-8", newline="")
     print(f"Report generated: {report_path}")
 
 
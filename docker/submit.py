@@ -11,6 +11,13 @@ import uuid
 from urllib.request import Request, urlopen
 from urllib.error import URLError, HTTPError
 
+try:
+    # 2-5x faster than stdlib json for the per-event payload decode, and
+    # parses bytes directly.
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 
 # ANSI color codes (optional, for terminal output)
 class Colors:
@@ -59,31 +66,48 @@ def parse_sse_events(response):
     """
     Parse SSE events from response stream.
 
+    Reads whatever the socket has ready (up to 64 KiB at a time) and
+    splits complete frames on the blank-line delimiter, so a burst of
+    test_result events costs a few bytes-level operations per event
+    instead of a per-line decode and startswith chain. Only the event
+    name and JSON payload are ever decoded.
+
     Yields tuples of (event_type, data_dict).
     """
-    event_type = None
-    data_lines = []
-
-    for line_bytes in response:
-        line = line_bytes.decode("utf-8").rstrip("\r\n")
-
-        if line.startswith(":"):
-            # Comment (keep-alive), ignore
-            continue
-        elif line.startswith("event:"):
-            event_type = line[6:].strip()
-        elif line.startswith("data:"):
-            data_lines.append(line[5:].strip())
-        elif line == "":
-            # End of event
-            if data_lines:
-                try:
-                    data = json.loads("\n".join(data_lines))
-                    yield (event_type, data)
-                except json.JSONDecodeError:
-                    pass
+    # read1 returns as soon as any bytes arrive; read(n) would block
+    # until the full 64 KiB accumulated and stall the live display.
+    read1 = getattr(response, "read1", response.read)
+    buf = bytearray()
+    while True:
+        chunk = read1(65536)
+        if chunk:
+            buf += chunk
+        while True:
+            end = buf.find(b"\n\n")
+            if end < 0:
+                break
+            frame = bytes(buf[:end])
+            del buf[: end + 2]
+
             event_type = None
-            data_lines = []
+            data_buf = bytearray()
+            for line in frame.split(b"\n"):
+                if line.startswith(b"event:"):
+                    event_type = line[6:].strip().decode("utf-8")
+                elif line.startswith(b"data:"):
+                    data_buf += line[5:].strip()
+                    data_buf += b"\n"
+                # Anything else (comments, unknown fields) is ignored.
+            if data_buf:
+                try:
+                    # Both orjson.JSONDecodeError and json.JSONDecodeError
+                    # subclass ValueError.
+                    data = _json_loads(bytes(data_buf))
+                except ValueError:
+                    continue
+                yield (event_type, data)
+        if not chunk:
+            break
 
 
 def handle_event(event_type: str, data: dict, verbose: bool = False) -> bool:
@@ -3,9 +3,12 @@ import argparse
 import json
 import os
 import re
+import select
 import signal
 import subprocess
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
@@ -53,27 +56,57 @@ def status_symbol(status: str) -> str:
     return colorize(status.upper(), Colors.YELLOW)
 
 
-def collect_labels(text: str) -> list[str]:
+# Compiled once; the `^\s*` the old inline pattern carried is redundant
+# because the line is already lstripped before matching. Bytes pattern:
+# the file is scanned raw and only the captured label is ever decoded.
+_LABEL_RE = re.compile(rb'test\s+"([^"]+)"')
+
+
+def collect_labels(path: Path) -> list[str]:
     labels: list[str] = []
-    for line in text.splitlines():
-        stripped = line.lstrip()
-        if stripped.startswith("//"):
-            continue
-        match = re.match(r'^\s*test\s+"([^"]+)"', line)
-        if match:
-            labels.append(match.group(1))
+    with open(path, "rb", buffering=1 << 20) as f:
+        for line in f:
+            stripped = line.lstrip()
+            # The prefix test rejects almost every line (including `//`
+            # comments) before the regex engine is ever entered.
+            if not stripped.startswith(b"test"):
+                continue
+            match = _LABEL_RE.match(stripped)
+            if match:
+                labels.append(match.group(1).decode("utf-8"))
     return labels
 
 
 def is_oom(returncode: int, stderr: str) -> bool:
     if returncode in (137, -9):
         return True
-    if returncode < 0 and -returncode == 9:
-        return True
+    if returncode == 0:
+        # The common case: a passing test never warrants lowercasing (a
+        # full copy of) its entire stderr just to scan for OOM markers.
+        return False
     stderr_lower = stderr.lower()
     return "out of memory" in stderr_lower or "oom" in stderr_lower
 
 
+_SKIP_DIRS = frozenset({".mooncakes", "_build", "target"})
+
+
+def _walk_test_files(root: str):
+    # Iterative scandir walk: skipped directories are pruned whole (rglob
+    # enumerated their contents just to filter them back out) and each
+    # entry's type comes from the directory read, with no Path objects
+    # built for the misses.
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in _SKIP_DIRS:
+                        stack.append(entry.path)
+                elif entry.name.endswith("_test.mbt"):
+                    yield entry.path
+
+
 def find_test_files(test_file_arg: str | None) -> list[Path]:
     if test_file_arg is not None:
         test_file = Path(test_file_arg)
@@ -81,10 +114,7 @@ def find_test_files(test_file_arg: str | None) -> list[Path]:
             print(f"missing test file: {test_file}", file=sys.stderr)
             return []
         return [test_file]
-    skip_dirs = {".mooncakes", "_build", "target"}
-    all_files = Path.cwd().rglob("*_test.mbt")
-    filtered = [f for f in all_files if not (skip_dirs & set(f.parts))]
-    return sorted(filtered)
+    return sorted(Path(p) for p in _walk_test_files(os.getcwd()))
 
 
 def truncate_message(text: str, max_lines: int = 20, max_line_length: int = 200) -> str:
@@ -103,10 +133,45 @@ def truncate_message(text: str, max_lines: int = 20, max_line_length: int = 200)
     return result
 
 
-def emit_result(result_dict: dict, json_mode: bool) -> None:
-    """Print a test result immediately if in JSON mode."""
+def emit_result(result_json: str, json_mode: bool) -> None:
+    """Print a serialized test result immediately if in JSON mode."""
     if json_mode:
-        print(json.dumps(result_dict), flush=True)
+        print(result_json, flush=True)
+
+
+_HAS_PIDFD = hasattr(os, "pidfd_open")
+
+
+def _wait_for_exit(proc: subprocess.Popen, timeout: float) -> bool:
+    """Wait up to `timeout` seconds for proc to exit; True if it did.
+
+    Popen.wait(timeout=...) (and communicate's timed wait) spin in a
+    sleep-and-waitpid loop; a pidfd becomes readable exactly when the
+    child dies, so poll() blocks in the kernel with zero CPU. Falls back
+    to the spinning wait on kernels without pidfd_open.
+    """
+    if _HAS_PIDFD:
+        try:
+            fd = os.pidfd_open(proc.pid)
+        except OSError:
+            # Kernel without pidfd support, or the process is already
+            # gone; the plain wait below settles it either way.
+            pass
+        else:
+            try:
+                poller = select.poll()
+                poller.register(fd, select.POLLIN)
+                if not poller.poll(timeout * 1000):
+                    return False
+            finally:
+                os.close(fd)
+            proc.wait()
+            return True
+    try:
+        proc.wait(timeout=timeout)
+        return True
+    except subprocess.TimeoutExpired:
+        return False
 
 
 def terminate_process_gracefully(
@@ -121,26 +186,26 @@ def terminate_process_gracefully(
     except ProcessLookupError:
         return proc.communicate()
 
+    # The child is dead after each successful wait, so the communicate()
+    # calls below only drain already-written pipe contents to EOF.
+    if _wait_for_exit(proc, grace_period):
+        return proc.communicate()
+
     try:
-        return proc.communicate(timeout=grace_period)
-    except subprocess.TimeoutExpired:
+        pgid = os.getpgid(proc.pid)
+        os.killpg(pgid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
         try:
-            pgid = os.getpgid(proc.pid)
-            os.killpg(pgid, signal.SIGKILL)
-        except (ProcessLookupError, PermissionError, OSError):
-            try:
-                proc.kill()
-            except ProcessLookupError:
-                pass
+            proc.kill()
+        except ProcessLookupError:
+            pass
 
+    if not _wait_for_exit(proc, 1):
         try:
-            return proc.communicate(timeout=1)
-        except subprocess.TimeoutExpired:
-            try:
-                proc.kill()
-            except ProcessLookupError:
-                pass
-            return proc.communicate()
+            proc.kill()
+        except ProcessLookupError:
+            pass
+    return proc.communicate()
 
 
 def terminate_process_group(proc: subprocess.Popen) -> None:
@@ -163,11 +228,8 @@ def terminate_process_group(proc: subprocess.Popen) -> None:
         except ProcessLookupError:
             return
 
-    try:
-        proc.wait(timeout=DEFAULT_GRACE_PERIOD_SECONDS)
+    if _wait_for_exit(proc, DEFAULT_GRACE_PERIOD_SECONDS):
         return
-    except subprocess.TimeoutExpired:
-        pass
 
     try:
         if pgid is not None:
@@ -180,10 +242,52 @@ def terminate_process_group(proc: subprocess.Popen) -> None:
         except ProcessLookupError:
             return
 
+    _wait_for_exit(proc, 1)
+
+
+# Live child processes across worker threads, so a KeyboardInterrupt in
+# the main thread can terminate every in-flight test.
+_live_procs: set[subprocess.Popen] = set()
+_live_procs_lock = threading.Lock()
+
+
+def run_one(test_file: Path, label: str, timeout: int) -> tuple[str, str]:
+    """Run a single test and classify the outcome.
+
+    Returns (status, message). Each child gets its own session (and
+    therefore pgid) so timeouts and interrupts can kill the whole
+    process tree without touching sibling tests.
+    """
+    message = ""
+    status = "pass"
+    cmd = ["moon", "test", str(test_file), "--filter", label]
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        start_new_session=True,
+    )
+    with _live_procs_lock:
+        _live_procs.add(proc)
     try:
-        proc.wait(timeout=1)
-    except subprocess.TimeoutExpired:
-        pass
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            stdout, stderr = terminate_process_gracefully(proc)
+            status = "timeout"
+            message = f"Test timed out after {timeout} seconds"
+        else:
+            if is_oom(proc.returncode, stderr):
+                status = "oom"
+                message = "Out of memory"
+            elif proc.returncode != 0:
+                status = "fail"
+                message = truncate_message(stdout + stderr)
+    finally:
+        with _live_procs_lock:
+            _live_procs.discard(proc)
+    return status, message
 
 
 def print_result(
@@ -210,6 +314,12 @@ def main() -> int:
         default=DEFAULT_TIMEOUT_SECONDS,
         help="per-test timeout in seconds",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of tests to run concurrently (default: CPU count)",
+    )
     parser.add_argument(
         "--json",
         action="store_true",
@@ -233,8 +343,9 @@ def main() -> int:
 
     test_labels: list[tuple[Path, str]] = []
     for test_file in test_files:
-        labels = collect_labels(test_file.read_text(encoding="utf-8"))
-        test_labels.extend((test_file, label) for label in labels)
+        test_labels.extend(
+            (test_file, label) for label in collect_labels(test_file)
+        )
 
     if args.test_name:
         matching = [
@@ -262,44 +373,32 @@ def main() -> int:
     timeouts: list[str] = []
     ooms: list[str] = []
     fails: list[str] = []
-    all_results: list[dict] = []
+    # Each result is serialized exactly once; the same string feeds the
+    # streaming JSONL output and the final results file.
+    all_results: list[str] = []
     # Emit test count upfront for streaming clients
     if args.json:
         print(json.dumps({"test_count": len(test_labels)}), flush=True)
 
-    current_proc: subprocess.Popen | None = None
+    # Each test is a fresh moon subprocess, so the run is I/O- and
+    # subprocess-bound; a bounded thread pool keeps up to --jobs children
+    # running instead of leaving the other cores idle between builds.
+    # Results stream in completion order with the index fixed at submit
+    # time, so [index/total] still identifies the test deterministically.
+    jobs = max(1, min(args.jobs, len(test_labels)))
+    executor = ThreadPoolExecutor(max_workers=jobs)
     try:
-        for index, (test_file, label) in enumerate(test_labels, start=1):
-            message = ""
-            status = "pass"
-            cmd = ["moon", "test", str(test_file), "--filter", label]
-            proc = subprocess.Popen(
-                cmd,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                start_new_session=True,
+        futures = {
+            executor.submit(run_one, test_file, label, args.timeout): (
+                index,
+                test_file,
+                label,
             )
-            current_proc = proc
-            try:
-                stdout, stderr = proc.communicate(timeout=args.timeout)
-            except subprocess.TimeoutExpired:
-                stdout, stderr = terminate_process_gracefully(proc)
-                status = "timeout"
-                message = f"Test timed out after {args.timeout} seconds"
-            except KeyboardInterrupt:
-                terminate_process_group(proc)
-                print("\nInterrupted by user. Terminated running test.", file=sys.stderr)
-                return 130
-            else:
-                if is_oom(proc.returncode, stderr):
-                    status = "oom"
-                    message = "Out of memory"
-                elif proc.returncode != 0:
-                    status = "fail"
-                    message = truncate_message(stdout + stderr)
-            finally:
-                current_proc = None
+            for index, (test_file, label) in enumerate(test_labels, start=1)
+        }
+        for future in as_completed(futures):
+            index, test_file, label = futures[future]
+            status, message = future.result()
 
             if status == "timeout":
                 timeouts.append(label)
@@ -315,15 +414,23 @@ def main() -> int:
             }
             if message:
                 result_dict["message"] = message
-            all_results.append(result_dict)
-            emit_result(result_dict, args.json)
+            result_json = json.dumps(result_dict)
+            all_results.append(result_json)
+            emit_result(result_json, args.json)
             if not args.json:
                 print_result(index, len(test_labels), label, status, message)
     except KeyboardInterrupt:
-        if current_proc is not None:
-            terminate_process_group(current_proc)
-        print("\nInterrupted by user. Terminated running test.", file=sys.stderr)
+        # Drop the queue first so no new children start, then kill the
+        # in-flight process groups; the workers unwind as their children
+        # die, so the non-waiting shutdown never hangs.
+        executor.shutdown(wait=False, cancel_futures=True)
+        with _live_procs_lock:
+            procs = list(_live_procs)
+        for proc in procs:
+            terminate_process_group(proc)
+        print("\nInterrupted by user. Terminated running tests.", file=sys.stderr)
         return 130
+    executor.shutdown()
 
     total = len(test_labels)
     bad = timeouts + ooms + fails
@@ -337,13 +444,17 @@ def main() -> int:
         "failed": len(fails),
     }
 
-    output = {
-        "results": all_results,
-        "summary": summary_dict,
-    }
     timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
     results_json_file = Path(f"./results-{timestamp}.json")
-    results_json_file.write_text(json.dumps(output, indent=2), encoding="utf-8")
+    # Assembled from the cached per-result strings instead of
+    # re-serializing every dict a second time; each result lands on one
+    # line of the (still valid JSON) document.
+    with results_json_file.open("w", encoding="utf-8") as f:
+        f.write('{\n  "results": [\n')
+        f.write(",\n".join("    " + line for line in all_results))
+        f.write('\n  ],\n  "summary": ')
+        f.write(json.dumps(summary_dict, indent=2).replace("\n", "\n  "))
+        f.write("\n}\n")
 
     if args.json:
         summary = {